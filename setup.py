@@ -48,5 +48,4 @@ setup(
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
     ],
-    namespace_packages=['sphinxcontrib'],
 )
@@ -9,4 +9,4 @@
     :license: BSD, see LICENSE for details.
 """
 
-__import__('pkg_resources').declare_namespace(__name__)
+__path__ = __import__('pkgutil').extend_path(__path__, __name__)
@@ -12,32 +12,78 @@
 from __future__ import unicode_literals
 
 import io
-import itertools
+import copy
+import os
+import re
+import json
+import hashlib
 import collections
 
-import yaml
-import jsonschema
-
 from docutils import nodes
 from docutils.parsers.rst import Directive, directives
 from docutils.statemachine import ViewList
 
+from sphinx.util import logging
 from sphinx.util.nodes import nested_parse_with_titles
 
 
-# Dictionaries do not guarantee to preserve the keys order so when we load
-# JSON or YAML - we may loose the order. In most cases it's not important
-# because we're interested in data. However, in case of OpenAPI spec it'd
-# be really nice to preserve them since, for example, endpoints may be
-# grouped logically and that improved readability.
-class _YamlOrderedLoader(yaml.SafeLoader):
-    pass
+logger = logging.getLogger(__name__)
 
 
-_YamlOrderedLoader.add_constructor(
-    yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG,
-    lambda loader, node: collections.OrderedDict(loader.construct_pairs(node))
-)
+# Both 'yaml' and 'jsonschema' take a while to import, yet they are needed
+# only when the directive is actually used. So they are imported on first
+# use, and the YAML loader below is built on first use as well.
+_YamlOrderedLoader = None
+
+
+def _get_yaml_loader():
+    global _YamlOrderedLoader
+
+    if _YamlOrderedLoader is None:
+        import yaml
+
+        # Dictionaries do not guarantee to preserve the keys order so when
+        # we load JSON or YAML - we may loose the order. In most cases it's
+        # not important because we're interested in data. However, in case
+        # of OpenAPI spec it'd be really nice to preserve them since, for
+        # example, endpoints may be grouped logically and that improved
+        # readability.
+        class YamlOrderedLoader(yaml.SafeLoader):
+            pass
+
+        YamlOrderedLoader.add_constructor(
+            yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG,
+            lambda loader, node: collections.OrderedDict(
+                loader.construct_pairs(node))
+        )
+        _YamlOrderedLoader = YamlOrderedLoader
+
+    return _YamlOrderedLoader
+
+
+# Specs loaded so far keyed by file path and encoding. The same spec is
+# often rendered by many directives (e.g. with different ':paths:'), yet
+# parsing YAML is slow, so the spec is parsed only once unless changed.
+_spec_cache = {}
+
+
+def _load_spec(abspath, encoding):
+    """Load the spec from file and return its text along with data.
+
+    Returned data is a copy of the cached one, so it may be modified.
+    """
+    import yaml
+
+    key = (abspath, encoding)
+    mtime = os.stat(abspath).st_mtime
+
+    if key not in _spec_cache or _spec_cache[key][0] != mtime:
+        with io.open(abspath, 'rt', encoding=encoding) as stream:
+            text = stream.read()
+        _spec_cache[key] = (mtime, text, yaml.load(text, _get_yaml_loader()))
+
+    _, text, spec = _spec_cache[key]
+    return text, copy.deepcopy(spec)
 
 
 def _resolve_refs(uri, spec):
@@ -53,6 +99,8 @@ def _resolve_refs(uri, spec):
     The input spec is modified in-place despite being returned from
     the function.
     """
+    import jsonschema
+
     resolver = jsonschema.RefResolver(uri, spec)
 
     def _do_resolve(node):
@@ -72,28 +120,24 @@ def _resolve_refs(uri, spec):
 
 def _collect_description(description):
     """Form the line from description"""
-    result = ''
-    for line in description.splitlines():
-        result += '{line}'.format(**locals())
-    return result
+    return ''.join(description.splitlines())
 
 
-def _create_partition(partition_name):
+def _create_partition(partition_name, lines):
     """Create bold partition line"""
-    yield '**{name} :**'.format(name=partition_name)
-    yield ''
+    lines.append('**%s :**' % partition_name)
+    lines.append('')
 
 
-def _print_parameters(parameters):
+def _print_parameters(parameters, lines):
     """Print parameters list with it's type and description"""
     for param in parameters:
-        req = param_is_required(param.get("required"))
-        description = _collect_description(param.get('description', ''))
-        yield '* {name} {req} (*{type}*) - {desc}'.format(
-            **param,
-            req=req,
-            desc=description)
-    yield ''
+        lines.append('* %s %s (*%s*) - %s' % (
+            param['name'],
+            param_is_required(param.get('required')),
+            param['type'],
+            _collect_description(param.get('description', ''))))
+    lines.append('')
 
 
 def param_is_required(required):
@@ -113,37 +157,36 @@ def _create_value_example(value):
 
 
 def _enclose_in_quotes(value):
-    return "\"{}\"".format(str(value))
+    return "\"%s\"" % (value, )
 
 
-def _create_object_schema_example(example, prv_first_level_items, first_level_items, indent_number=1):
+def _create_object_schema_example(example, prv_first_level_items,
+                                  first_level_items, lines, indent_number=1):
     """Print json example"""
-    indent = '   '
-    yield indent * indent_number + '{'
+    indent = '   ' * indent_number
+    lines.append(indent + '{')
 
     for key, value in example.items():
         first_level_items = _first_level_decrement(first_level_items)
         if isinstance(value, dict):
-            level_items = _count_first_level_items(value)
-            yield indent * (indent_number + 1) + _enclose_in_quotes(key) + ": "
-            for line in iter(_create_object_schema_example(value, first_level_items, level_items, indent_number + 1)):
-                yield line
+            lines.append(indent + '   ' + _enclose_in_quotes(key) + ": ")
+            _create_object_schema_example(
+                value, first_level_items, len(value), lines, indent_number + 1)
         elif isinstance(value, list):
-            level_items = _count_first_level_items(value)
-            yield indent * (indent_number + 1) + _enclose_in_quotes(key) + ": "
-            for line in iter(_create_list_schema_example(value, first_level_items, level_items, indent_number + 1)):
-                yield line
+            lines.append(indent + '   ' + _enclose_in_quotes(key) + ": ")
+            _create_list_schema_example(
+                value, first_level_items, len(value), lines, indent_number + 1)
         else:
-            line = indent * (indent_number + 1) + _enclose_in_quotes(key) + ": " + _create_value_example(value)
+            line = indent + '   ' + _enclose_in_quotes(key) + ": " + \
+                _create_value_example(value)
             if first_level_items != 0:
-                yield line + ','
-            else:
-                yield line
+                line += ','
+            lines.append(line)
 
     if prv_first_level_items == 0:
-        yield indent * indent_number + '}'
+        lines.append(indent + '}')
     else:
-        yield indent * indent_number + '},'
+        lines.append(indent + '},')
 
 
 def _first_level_decrement(value):
@@ -151,138 +194,138 @@ def _first_level_decrement(value):
         return value - 1
 
 
-def _create_list_schema_example(example, prv_first_level_items, first_level_items, indent_number=1):
+def _create_list_schema_example(example, prv_first_level_items,
+                                first_level_items, lines, indent_number=1):
     """Print list example"""
-    indent = '   '
-    yield indent * indent_number + '['
+    indent = '   ' * indent_number
+    lines.append(indent + '[')
 
     for value in example:
         first_level_items = _first_level_decrement(first_level_items)
         if isinstance(value, dict):
-            level_items = _count_first_level_items(value)
-            for line in iter(_create_object_schema_example(value, first_level_items, level_items, indent_number + 1)):
-                yield line
+            _create_object_schema_example(
+                value, first_level_items, len(value), lines, indent_number + 1)
         elif isinstance(value, list):
-            level_items = _count_first_level_items(value)
-            for line in iter(_create_list_schema_example(value, first_level_items, level_items, indent_number + 1)):
-                yield line
+            _create_list_schema_example(
+                value, first_level_items, len(value), lines, indent_number + 1)
         else:
-            line = indent * (indent_number + 1) + _create_value_example(value)
+            line = indent + '   ' + _create_value_example(value)
             if first_level_items != 0:
-                yield line + ','
-            else:
-                yield line
+                line += ','
+            lines.append(line)
 
     if prv_first_level_items == 0:
-        yield indent * indent_number + ']'
+        lines.append(indent + ']')
     else:
-        yield indent * indent_number + '],'
+        lines.append(indent + '],')
 
 
-def _count_first_level_items(structure):
-    return len(structure)
-
-
-def _create_schema_example(example, example_title="Example"):
+def _create_schema_example(example, lines, example_title="Example"):
     if not example:
-        return None
-    yield ''
-    yield '{title} ::'.format(title=example_title)
-    yield ''
+        return
+    lines.append('')
+    lines.append('%s ::' % example_title)
+    lines.append('')
     if isinstance(example, dict):
-        for line in iter(_create_object_schema_example(example, 0, _count_first_level_items(example))):
-            yield line
+        _create_object_schema_example(example, 0, len(example), lines)
     elif isinstance(example, list):
-        for line in iter(_create_list_schema_example(example, 0, _count_first_level_items(examples))):
-            yield line
-    yield ''
+        _create_list_schema_example(example, 0, len(example), lines)
+    lines.append('')
+
 
+def _httpresource(endpoint, method, properties, lines, note=None):
+    """Render an operation as reStructuredText.
 
-def _httpresource(endpoint, method, properties):
+    Rendered lines are appended to the ``lines`` list, so the whole spec is
+    collected into a single buffer instead of chaining a generator per
+    every rendered piece. If ``note`` is passed, it's rendered right after
+    the operation's title.
+    """
     parameters = properties.get('parameters', [])
     responses = properties['responses']
     indent = '   '
 
-    api = "{0} {1}".format(method, endpoint)
+    api = "%s %s" % (method, endpoint)
     api = api.replace('{', '{{')
     api = api.replace('}', '}}')
-    yield api
-    yield '*' * len(api)
-    yield ''
+    lines.append(api)
+    lines.append('*' * len(api))
+    lines.append('')
+
+    if note is not None:
+        lines.append(note)
+        lines.append('')
 
     if 'summary' in properties:
-        for line in properties['summary'].splitlines():
-            yield '{line}'.format(**locals())
+        lines.extend(properties['summary'].splitlines())
 
-    yield _collect_description(properties.get('description', ''))
-    yield ''
+    lines.append(_collect_description(properties.get('description', '')))
+    lines.append('')
 
     # print request header params
-    header_parameters = list(filter(lambda p: p['in'] == 'header', parameters))
+    header_parameters = [p for p in parameters if p['in'] == 'header']
     if header_parameters:
-        for line in iter(itertools.chain(_create_partition("Request headers"))):
-            yield line
-        for line in iter(itertools.chain(_print_parameters(header_parameters))):
-            yield line
+        _create_partition("Request headers", lines)
+        _print_parameters(header_parameters, lines)
 
     # print response headers
     for status, response in responses.items():
         for headername, header in response.get('headers', {}).items():
-            yield indent + ':resheader {name}:'.format(name=headername)
+            lines.append(indent + ':resheader %s:' % headername)
             for line in header['description'].splitlines():
-                yield '{indent}{indent}{line}'.format(**locals())
-    yield ''
+                lines.append(indent + indent + line)
+    lines.append('')
 
-    yield ''
+    lines.append('')
 
     # print request's route params
-    path_parameters = list(filter(lambda p: p['in'] == 'path', parameters))
+    path_parameters = [p for p in parameters if p['in'] == 'path']
     if path_parameters:
-        for line in iter(itertools.chain(_create_partition("Path parameters"))):
-            yield line
-        for line in iter(itertools.chain(_print_parameters(path_parameters))):
-            yield line
+        _create_partition("Path parameters", lines)
+        _print_parameters(path_parameters, lines)
 
     # print request's query params
-    query_parameters = list(filter(lambda p: p['in'] == 'query', parameters))
+    query_parameters = [p for p in parameters if p['in'] == 'query']
     if query_parameters:
-        for line in iter(itertools.chain(_create_partition("Query parameters"))):
-            yield line
-        for line in iter(itertools.chain(_print_parameters(query_parameters))):
-            yield line
+        _create_partition("Query parameters", lines)
+        _print_parameters(query_parameters, lines)
 
     # print request body params
-    for param in filter(lambda p: p['in'] == 'body', parameters):
-        for line in iter(itertools.chain(_create_partition("Body"))):
-            yield line
-        for _property, value in param.get("schema", {}).get("properties").items():
+    for param in parameters:
+        if param['in'] != 'body':
+            continue
+        _create_partition("Body", lines)
+        schema_properties = param.get("schema", {}).get("properties")
+        for _property, value in schema_properties.items():
             description = _collect_description(value.get('description', ''))
             _range = ''
             if value.get("type") == 'integer':
-                _range = "Range: (" + str(value.get('minimum', '-')) + ', ' + str(value.get('maximum', '-')) + ")."
-            yield '* {name} (*{type}*) - {desc} {range}'.format(
-                type=value.get("type"),
-                name=_property,
-                desc=description,
-                range=_range)
-        yield ''
+                _range = "Range: (%s, %s)." % (
+                    value.get('minimum', '-'), value.get('maximum', '-'))
+            lines.append('* %s (*%s*) - %s %s' % (
+                _property, value.get("type"), description, _range))
+        lines.append('')
         example = param.get("schema", {}).get("example", {})
-        for line in iter(_create_schema_example(example)):
-            yield line
+        _create_schema_example(example, lines)
 
     # print response status codes
-    if responses.items():
-        for line in iter(itertools.chain(_create_partition("Status code"))):
-            yield line
+    if responses:
+        _create_partition("Status code", lines)
         for status, response in responses.items():
             description = _collect_description(response.get('description', ''))
-            yield '* {status} - {description}'.format(**locals())
+            lines.append('* %s - %s' % (status, description))
             example = response.get("schema", {}).get("example", {})
-            for line in iter(_create_schema_example(example, "Response example")):
-                yield line
-        yield ''
+            _create_schema_example(example, lines, "Response example")
+        lines.append('')
 
 
+# Path item may contain keys other than operations, e.g. vendor extensions
+# ('x-*') or OpenAPI 3 'summary' and 'servers'. Only these keys are treated
+# as operations.
+_HTTP_METHODS = (
+    'get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace',
+)
+
 
 def _normalize_spec(spec, **options):
     # OpenAPI spec may contain JSON references, so we need resolve them
@@ -297,20 +340,18 @@ def _normalize_spec(spec, **options):
     # endpoints definitions.
     for endpoint in spec['paths'].values():
         parameters = endpoint.pop('parameters', [])
-        for method in endpoint.values():
-            method.setdefault('parameters', [])
-            method['parameters'].extend(parameters)
+        for method, properties in endpoint.items():
+            if method in _HTTP_METHODS:
+                properties.setdefault('parameters', [])
+                properties['parameters'].extend(parameters)
 
 
-def openapi2httpdomain(spec, **options):
-    generators = []
-
-    # OpenAPI spec may contain JSON references, common properties, etc.
-    # Trying to render the spec "As Is" will require to put multiple
-    # if-s around the code. In order to simplify flow, let's make the
-    # spec to have only one (expected) schema, i.e. normalize it.
-    _normalize_spec(spec, **options)
+def _iterate_operations(spec, **options):
+    """Return ``(endpoint, method, properties)`` of operations to render.
 
+    Operations are returned in the spec order and, if ``paths`` option is
+    passed, only for the given paths.
+    """
     # If 'paths' are passed we've got to ensure they exist within an OpenAPI
     # spec; otherwise raise error and ask user to fix that.
     if 'paths' in options:
@@ -321,11 +362,513 @@ def openapi2httpdomain(spec, **options):
                 )
             )
 
-    for endpoint in options.get('paths', spec['paths']):
-        for method, properties in spec['paths'][endpoint].items():
-            generators.append(_httpresource(endpoint, method, properties))
+    return [
+        (endpoint, method, properties)
+        for endpoint in options.get('paths', spec['paths'])
+        for method, properties in spec['paths'][endpoint].items()
+        if method in _HTTP_METHODS
+    ]
+
+
+def openapi2httpdomain(spec, **options):
+    # OpenAPI spec may contain JSON references, common properties, etc.
+    # Trying to render the spec "As Is" will require to put multiple
+    # if-s around the code. In order to simplify flow, let's make the
+    # spec to have only one (expected) schema, i.e. normalize it.
+    _normalize_spec(spec, **options)
+
+    operations = _iterate_operations(spec, **options)
+
+    # Operations are independent from each other, so they may be rendered
+    # by a pool of processes if asked to. That's worth doing for huge specs
+    # only, since starting the pool is not free.
+    jobs = min(options.get('jobs', 1), len(operations))
+    if jobs > 1:
+        import multiprocessing
+
+        if not multiprocessing.current_process().daemon:
+            return iter(_render_parallel(operations, jobs))
+
+    lines = []
+    for endpoint, method, properties in operations:
+        _httpresource(endpoint, method, properties, lines)
+
+    return iter(lines)
+
+
+def _is_positive_int(value):
+    # Booleans are integers in Python, yet 'True' jobs make no sense.
+    return isinstance(value, int) and not isinstance(value, bool) \
+        and value > 0
+
+
+# Operations to be rendered by pool workers. When processes are forked,
+# workers inherit operations from the parent process, so the spec is never
+# pickled; otherwise it's passed once per worker to the pool initializer.
+_pool_operations = None
+
+
+def _init_pool(operations):
+    global _pool_operations
+    if operations is not None:
+        _pool_operations = operations
+
+
+def _render_chunk(bounds):
+    lines = []
+    for endpoint, method, properties in _pool_operations[bounds[0]:bounds[1]]:
+        _httpresource(endpoint, method, properties, lines)
+    return lines
+
+
+def _render_parallel(operations, jobs):
+    """Render operations by a pool of processes.
+
+    Operations are split into contiguous chunks, a few per process to
+    balance the load, and rendered lines are joined in the spec order, so
+    the result is the same as if operations are rendered serially.
+    """
+    global _pool_operations
+
+    import multiprocessing
+
+    # The start method is left up to the user (or the platform default),
+    # since forking isn't safe everywhere, e.g. on macOS.
+    context = multiprocessing.get_context()
+    if context.get_start_method() == 'fork':
+        initargs = (None, )
+        _pool_operations = operations
+    else:
+        initargs = (operations, )
+
+    size = max(1, len(operations) // (jobs * 4))
+    chunks = [
+        (start, start + size) for start in range(0, len(operations), size)
+    ]
+
+    try:
+        pool = context.Pool(jobs, _init_pool, initargs)
+        try:
+            results = pool.map(_render_chunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _pool_operations = None
+
+    lines = []
+    for chunk in results:
+        lines.extend(chunk)
+    return lines
+
+
+def _jsonable(node, parents=()):
+    # Loaded specs consist of builtin types only, so checking for them is
+    # enough here and is much faster than checking against abstract ones.
+    if isinstance(node, (dict, list)):
+        # Recursive schemas are resolved into cyclic objects, so a reference
+        # back to an enclosing node is replaced with a marker telling how
+        # many levels up it points to.
+        if id(node) in parents:
+            return {'$cycle': len(parents) - parents.index(id(node))}
+        parents += (id(node), )
+
+    if isinstance(node, dict):
+        return collections.OrderedDict(
+            ('%s' % k, _jsonable(v, parents)) for k, v in node.items())
+    elif isinstance(node, list):
+        return [_jsonable(v, parents) for v in node]
+    return node
+
+
+def _canonical_json(node):
+    try:
+        return json.dumps(
+            node, sort_keys=True, separators=(',', ':'), default=str)
+    except (TypeError, ValueError):
+        # YAML allows non-string keys (e.g. integer status codes) which
+        # can't be sorted along with string ones, and recursive schemas
+        # can't be serialized at all, so in these rare cases the node has
+        # to be converted first.
+        return json.dumps(
+            _jsonable(node),
+            sort_keys=True, separators=(',', ':'), default=str)
+
+
+def _hash_operations(spec, paths):
+    # Keys are not sorted here since it's much faster to serialize them in
+    # spec order. Operations with reordered keys get different hashes, but
+    # they are compared thoroughly later on.
+    hashes = collections.OrderedDict()
+    for endpoint, method, properties in _iterate_operations(spec):
+        if paths is None or endpoint in paths:
+            try:
+                text = json.dumps(
+                    properties, separators=(',', ':'), default=str)
+            except ValueError:
+                text = json.dumps(
+                    _jsonable(properties), separators=(',', ':'), default=str)
+            hashes[endpoint, method] = hashlib.sha1(
+                text.encode('utf-8')).hexdigest()
+    return hashes
+
+
+def _diff_operations(old, new, paths=None):
+    """Return operations changed between two normalized specs.
+
+    Operations are compared by content hashes, so unchanged operations cost
+    a single lookup, and only operations with different hashes are compared
+    field by field. Yields ``(change, endpoint, method, properties,
+    fields)`` tuples, where ``change`` is one of 'added', 'removed' or
+    'modified', and ``fields`` is a list of changed operation's fields.
+    Added and modified operations come in the new spec order, followed by
+    removed operations in the old spec order.
+    """
+    # If 'paths' are passed we've got to ensure they exist within at least
+    # one of OpenAPI specs; otherwise raise error and ask user to fix that.
+    if paths is not None:
+        unknown = set(paths) - set(old['paths']) - set(new['paths'])
+        if unknown:
+            raise ValueError(
+                'One or more paths are not defined in the specs: %s.' % (
+                    ', '.join(unknown), ))
+
+    old_hashes = _hash_operations(old, paths)
+    new_hashes = _hash_operations(new, paths)
+
+    for endpoint, method in new_hashes:
+        properties = new['paths'][endpoint][method]
+
+        if (endpoint, method) not in old_hashes:
+            yield 'added', endpoint, method, properties, []
+
+        elif old_hashes[endpoint, method] != new_hashes[endpoint, method]:
+            old_properties = old['paths'][endpoint][method]
+            fields = [
+                field
+                for field in sorted(set(old_properties) | set(properties))
+                if _canonical_json(old_properties.get(field)) !=
+                _canonical_json(properties.get(field))
+            ]
+            if fields:
+                yield 'modified', endpoint, method, properties, fields
+
+    for endpoint, method in old_hashes:
+        if (endpoint, method) not in new_hashes:
+            properties = old['paths'][endpoint][method]
+            yield 'removed', endpoint, method, properties, []
+
+
+def openapidiff2httpdomain(old, new, **options):
+    """Render operations changed between two OpenAPI specs.
+
+    Each operation is rendered as by ``openapi2httpdomain`` and annotated
+    with a kind of change. Relative references of the old spec are resolved
+    against ``old_uri`` option, and of the new one against ``uri`` option.
+    """
+    _normalize_spec(old, uri=options.get('old_uri', ''))
+    _normalize_spec(new, uri=options.get('uri', ''))
+
+    lines = []
+    for change, endpoint, method, properties, fields in _diff_operations(
+            old, new, options.get('paths')):
+        if change == 'modified':
+            note = '*Modified: %s.*' % ', '.join(fields)
+        else:
+            note = '*%s.*' % change.capitalize()
+        _httpresource(endpoint, method, properties, lines, note)
+
+    return iter(lines)
+
+
+_PARAMETER_LOCATIONS = (
+    'query', 'header', 'path', 'formData', 'body', 'cookie',
+)
+
+_VALIDATION_MODES = ('off', 'fast', 'full')
+
+# OpenAPI meta-schemas shipped along with the extension, so the full
+# validation doesn't require network access.
+_META_SCHEMAS = {
+    '2.0': 'v2.0.json',
+    '3.0': 'v3.0.json',
+}
+
+# Building a validator requires loading and checking a meta-schema which
+# is quite costly, so validators are built once and reused for every spec.
+_meta_validators = {}
+
+# Validation verdicts keyed by validation mode and spec content hash. The
+# same spec is usually rendered by many directives, yet it has to be
+# validated only once per process. Parallel reads use several processes,
+# so then the spec is validated (and reported) by each of them.
+_validation_cache = {}
+
+
+def _is_ref(node):
+    return isinstance(node, collections.Mapping) and '$ref' in node
+
+
+def _check_parameter(param, path):
+    if _is_ref(param):
+        return
+    if not isinstance(param, collections.Mapping):
+        yield path, 'parameter must be a mapping'
+        return
+
+    for name in ('name', 'in'):
+        if name not in param:
+            yield path, "'%s' is a required property" % name
+
+    if 'in' in param and param['in'] not in _PARAMETER_LOCATIONS:
+        yield path + ('in', ), "unknown parameter location '%s'" % (
+            param['in'], )
+
+    if param.get('in') == 'body':
+        schema = param.get('schema')
+        if not _is_ref(schema) and not (
+                isinstance(schema, collections.Mapping) and
+                isinstance(schema.get('properties'), collections.Mapping)):
+            yield path, "body parameter must have 'schema' with 'properties'"
+    elif 'in' in param and 'type' not in param:
+        yield path, "'type' is a required property"
+
+
+def _check_parameters(parameters, path):
+    if not isinstance(parameters, list):
+        yield path, 'parameters must be a list'
+        return
+
+    for i, param in enumerate(parameters):
+        for error in _check_parameter(param, path + (i, )):
+            yield error
+
+
+def _check_response(response, path):
+    if _is_ref(response):
+        return
+    if not isinstance(response, collections.Mapping):
+        yield path, 'response must be a mapping'
+        return
+
+    headers = response.get('headers', {})
+    if not isinstance(headers, collections.Mapping):
+        yield path + ('headers', ), 'headers must be a mapping'
+        return
+
+    for headername, header in headers.items():
+        if _is_ref(header):
+            continue
+        if not isinstance(header, collections.Mapping) \
+                or 'description' not in header:
+            yield path + ('headers', headername), (
+                "'description' is a required property")
+
+
+def _check_responses(responses, path):
+    if not isinstance(responses, collections.Mapping):
+        yield path, 'responses must be a mapping'
+        return
+
+    for status, response in responses.items():
+        for error in _check_response(response, path + (status, )):
+            yield error
+
+
+# Reusable parameters and responses of OpenAPI 2 and 3 specs respectively.
+# Operations refer to them, so they are rendered as if they are defined
+# inline and hence have to be checked the same way.
+_REUSABLE_SECTIONS = (
+    (('parameters', ), _check_parameter),
+    (('responses', ), _check_response),
+    (('components', 'parameters'), _check_parameter),
+    (('components', 'responses'), _check_response),
+)
+
+
+def _check_structure(spec):
+    """Check that the spec has the structure required for rendering.
+
+    The check looks only at nodes ``openapi2httpdomain`` relies on, and
+    walks the spec once. JSON references are not followed, since they are
+    not resolved yet, but local reusable parameters and responses they
+    usually point to are checked in place.
+
+    Yields ``(path, message)`` tuples, where ``path`` is a tuple of keys
+    leading to the offending node.
+    """
+    if not isinstance(spec, collections.Mapping):
+        yield (), 'spec must be a mapping'
+        return
+
+    if 'paths' not in spec:
+        yield (), "'paths' is a required property"
+        return
+
+    if not isinstance(spec['paths'], collections.Mapping):
+        yield ('paths', ), 'paths must be a mapping'
+        return
+
+    for endpoint, pathitem in spec['paths'].items():
+        path = ('paths', endpoint)
+
+        if _is_ref(pathitem):
+            continue
+        if not isinstance(pathitem, collections.Mapping):
+            yield path, 'path item must be a mapping'
+            continue
+
+        if 'parameters' in pathitem:
+            for error in _check_parameters(
+                    pathitem['parameters'], path + ('parameters', )):
+                yield error
+
+        for method, operation in pathitem.items():
+            if method not in _HTTP_METHODS:
+                continue
+            if not isinstance(operation, collections.Mapping):
+                yield path + (method, ), 'operation must be a mapping'
+                continue
+
+            for name in ('summary', 'description'):
+                if not isinstance(operation.get(name, ''), str):
+                    yield path + (method, name), '%s must be a string' % name
+
+            if 'parameters' in operation:
+                for error in _check_parameters(
+                        operation['parameters'],
+                        path + (method, 'parameters')):
+                    yield error
+
+            if 'responses' not in operation:
+                yield path + (method, ), "'responses' is a required property"
+            else:
+                for error in _check_responses(
+                        operation['responses'],
+                        path + (method, 'responses')):
+                    yield error
+
+    for path, check in _REUSABLE_SECTIONS:
+        section = spec
+        for key in path:
+            if not isinstance(section, collections.Mapping):
+                section = {}
+            section = section.get(key, {})
+        if not isinstance(section, collections.Mapping):
+            yield path, '%s must be a mapping' % path[-1]
+            continue
+
+        for name, node in section.items():
+            for error in check(node, path + (name, )):
+                yield error
+
+
+def _get_meta_validator(version):
+    if version not in _meta_validators:
+        import jsonschema
+
+        filename = os.path.join(
+            os.path.dirname(__file__),
+            'openapi-schemas',
+            _META_SCHEMAS[version])
+        with io.open(filename, 'rt', encoding='utf-8') as stream:
+            schema = json.load(stream)
+        cls = jsonschema.validators.validator_for(schema)
+        _meta_validators[version] = cls(schema)
+    return _meta_validators[version]
+
+
+def _check_schema(spec):
+    """Validate the spec against the OpenAPI meta-schema.
+
+    Yields ``(path, message)`` tuples, where ``path`` is a tuple of keys
+    leading to the offending node.
+    """
+    version = '%s' % spec.get('swagger', spec.get('openapi', ''))
+    if version == '2.0':
+        validator = _get_meta_validator('2.0')
+    elif version.startswith('3.0.'):
+        validator = _get_meta_validator('3.0')
+    else:
+        # Meta-schemas are bundled for some versions only, and not knowing
+        # the version doesn't mean the spec can't be rendered.
+        logger.warning(
+            'No OpenAPI meta-schema for version %r, skipping its validation.',
+            version)
+        return
+
+    # YAML allows non-string keys (e.g. response status codes are often
+    # integers) while JSON Schema does not, so let's convert the spec into
+    # its JSON form before validation.
+    spec = json.loads(json.dumps(spec, default=str))
 
-    return iter(itertools.chain(*generators))
+    for error in validator.iter_errors(spec):
+        yield tuple(error.absolute_path), error.message
+
+
+def _validate_spec(spec, mode):
+    """Validate the spec and return a list of ``(path, message)`` tuples.
+
+    The ``fast`` mode checks only the structure required for rendering,
+    while the ``full`` mode additionally validates the spec against the
+    OpenAPI meta-schema.
+    """
+    errors = list(_check_structure(spec))
+    if mode == 'full' and isinstance(spec, collections.Mapping):
+        errors.extend(
+            error for error in _check_schema(spec) if error not in errors)
+    return errors
+
+
+def _validate_spec_cached(text, spec, mode):
+    """Validate the spec unless it has been validated before.
+
+    Returns a list of ``(line, message)`` tuples along with a flag telling
+    whether the errors are just computed, so they are reported only once.
+    """
+    import yaml
+
+    key = (mode, hashlib.sha1(text.encode('utf-8')).hexdigest())
+    if key in _validation_cache:
+        return _validation_cache[key], False
+
+    errors = _validate_spec(spec, mode)
+    if errors:
+        root = yaml.compose(text, yaml.SafeLoader)
+        errors = [
+            (_find_line(root, path), '%s: %s' % (_json_pointer(path), message))
+            for path, message in errors
+        ]
+
+    _validation_cache[key] = errors
+    return errors, True
+
+
+def _json_pointer(path):
+    return '#' + ''.join(
+        '/' + ('%s' % key).replace('~', '~0').replace('/', '~1')
+        for key in path)
+
+
+def _find_line(node, path):
+    """Return a 1-based line of the deepest YAML node found on the path."""
+    import yaml
+
+    line = node.start_mark.line
+    for key in path:
+        if isinstance(node, yaml.MappingNode):
+            pairs = [(k, v) for k, v in node.value if k.value == '%s' % key]
+            if not pairs:
+                break
+            keynode, node = pairs[0]
+            line = keynode.start_mark.line
+        elif isinstance(node, yaml.SequenceNode) and \
+                isinstance(key, int) and key < len(node.value):
+            node = node.value[key]
+            line = node.start_mark.line
+        else:
+            break
+    return line + 1
 
 
 class OpenApi(Directive):
@@ -335,11 +878,16 @@ class OpenApi(Directive):
     option_spec = {
         'encoding': directives.encoding,    # useful for non-ascii cases :)
         'paths': lambda s: s.split(),       # endpoints to be rendered
+        'jobs': directives.positive_int,    # processes to render with
     }
 
-    def run(self):
+    def load_spec(self, argument):
+        """Load the spec passed as directive's argument.
+
+        Returns absolute path to the spec along with the spec itself.
+        """
         env = self.state.document.settings.env
-        relpath, abspath = env.relfn2path(directives.path(self.arguments[0]))
+        relpath, abspath = env.relfn2path(directives.path(argument))
 
         # Add OpenAPI spec as a dependency to the current document. That means
         # the document will be rebuilt if the spec is changed.
@@ -348,21 +896,39 @@ class OpenApi(Directive):
         # Read the spec using encoding passed to the directive or fallback to
         # the one specified in Sphinx's config.
         encoding = self.options.get('encoding', env.config.source_encoding)
-        with io.open(abspath, 'rt', encoding=encoding) as stream:
-            spec = yaml.load(stream, _YamlOrderedLoader)
-
-        # URI parameter is crucial for resolving relative references. So
-        # we need to set this option properly as it's used later down the
-        # stack.
-        self.options.setdefault('uri', 'file://%s' % abspath)
-
+        text, spec = _load_spec(abspath, encoding)
+
+        # Malformed spec makes rendering fail somewhere deep inside with
+        # quite obscure error, so let's check the spec beforehand if asked
+        # to and report problems pointing to the spec's lines.
+        mode = env.config.openapi_validate
+        if mode not in _VALIDATION_MODES:
+            raise self.error(
+                'Invalid openapi_validate value: %s. Expected one of: %s.' % (
+                    mode, ', '.join(_VALIDATION_MODES)))
+
+        if mode != 'off':
+            errors, computed = _validate_spec_cached(text, spec, mode)
+            if errors:
+                if computed:
+                    for line, message in errors:
+                        logger.warning(
+                            message, location='%s:%d' % (abspath, line))
+                raise self.error(
+                    'OpenAPI spec %s is invalid, see warnings above.' % (
+                        relpath, ))
+
+        return abspath, spec
+
+    def parse(self, lines):
+        """Parse reStructuredText lines and return a section with them."""
         # reStructuredText DOM manipulation is pretty tricky task. It requires
         # passing dozen arguments which is not easy without well-documented
         # internals. So the idea here is to represent OpenAPI spec as
         # reStructuredText in-memory text and parse it in order to produce a
         # real DOM.
         viewlist = ViewList()
-        for line in openapi2httpdomain(spec, **self.options):
+        for line in lines:
             viewlist.append(line, '<openapi>')
 
         # Parse reStructuredText contained in `viewlist` and return produced
@@ -370,9 +936,173 @@ class OpenApi(Directive):
         node = nodes.section()
         node.document = self.state.document
         nested_parse_with_titles(self.state, viewlist, node)
+        return node
+
+    def run(self):
+        env = self.state.document.settings.env
+        abspath, spec = self.load_spec(self.arguments[0])
+
+        # URI parameter is crucial for resolving relative references. So
+        # we need to set this option properly as it's used later down the
+        # stack.
+        self.options.setdefault('uri', 'file://%s' % abspath)
+        if 'jobs' not in self.options:
+            jobs = env.config.openapi_render_jobs
+            if not _is_positive_int(jobs):
+                raise self.error(
+                    'Invalid openapi_render_jobs value: %r. Expected a '
+                    'positive integer.' % (jobs, ))
+            self.options['jobs'] = jobs
+
+        node = self.parse(openapi2httpdomain(spec, **self.options))
+
+        if env.config.openapi_inventory:
+            _note_operations(
+                env, _iterate_operations(spec, **self.options), node)
+
+        return node.children
+
+
+class OpenApiDiff(OpenApi):
+
+    required_arguments = 2                  # paths to old and new specs
+    final_argument_whitespace = False
+    option_spec = {
+        'encoding': directives.encoding,    # useful for non-ascii cases :)
+        'paths': lambda s: s.split(),       # endpoints to be compared
+    }
+
+    def run(self):
+        old_abspath, old = self.load_spec(self.arguments[0])
+        abspath, new = self.load_spec(self.arguments[1])
+
+        # URI parameters are crucial for resolving relative references, and
+        # each spec has its own one.
+        self.options.setdefault('old_uri', 'file://%s' % old_abspath)
+        self.options.setdefault('uri', 'file://%s' % abspath)
+
+        node = self.parse(openapidiff2httpdomain(old, new, **self.options))
         return node.children
 
 
+_INVENTORY_FORMATS = ('json', 'ndjson')
+
+
+def _note_operations(env, operations, node):
+    """Remember rendered operations in the env for the inventory."""
+    # Each operation is rendered as a section, so sections produced by
+    # parsing follow operations one by one. Their ids are unique within
+    # the document and may be used as anchors.
+    sections = [n for n in node.children if isinstance(n, nodes.section)]
+    if len(sections) == len(operations):
+        anchors = [section['ids'][0] for section in sections]
+    else:
+        anchors = [None] * len(operations)
+
+    if not hasattr(env, 'openapi_operations'):
+        env.openapi_operations = {}
+
+    noted = env.openapi_operations.setdefault(env.docname, [])
+    for (endpoint, method, properties), anchor in zip(operations, anchors):
+        noted.append(collections.OrderedDict([
+            ('method', method.upper()),
+            ('path', endpoint),
+            ('operationId', properties.get('operationId')),
+            ('tags', list(properties.get('tags', []))),
+            ('summary', properties.get('summary')),
+            ('docname', env.docname),
+            ('anchor', anchor),
+        ]))
+
+
+def _purge_operations(app, env, docname):
+    if hasattr(env, 'openapi_operations'):
+        env.openapi_operations.pop(docname, None)
+
+
+def _merge_operations(app, env, docnames, other):
+    if not hasattr(env, 'openapi_operations'):
+        env.openapi_operations = {}
+
+    for docname in docnames:
+        if docname in getattr(other, 'openapi_operations', {}):
+            env.openapi_operations[docname] = \
+                other.openapi_operations[docname]
+
+
+def _build_inventory(operations, get_target_uri):
+    """Return a list of operations sorted by document in spec order."""
+    inventory = []
+    for docname in sorted(operations):
+        uri = get_target_uri(docname)
+        for operation in operations[docname]:
+            operation = collections.OrderedDict(operation)
+            operation['uri'] = uri
+            if operation['anchor']:
+                operation['uri'] += '#' + operation['anchor']
+            inventory.append(operation)
+    return inventory
+
+
+def _build_search_index(inventory):
+    """Return a mapping of lowercase terms to inventory positions.
+
+    Terms are taken from operation's method, path, operationId, tags and
+    summary, so a search is a matter of a single lookup per term.
+    """
+    index = {}
+    for i, operation in enumerate(inventory):
+        text = ' '.join([
+            operation['method'],
+            operation['path'],
+            operation['operationId'] or '',
+            operation['summary'] or '',
+        ] + operation['tags'])
+        for term in sorted(set(re.findall(r'\w+', text.lower()))):
+            index.setdefault(term, []).append(i)
+    return collections.OrderedDict(sorted(index.items()))
+
+
+def _write_inventory(app, exception):
+    fmt = app.config.openapi_inventory
+    if exception is not None or not fmt:
+        return
+
+    if fmt not in _INVENTORY_FORMATS:
+        logger.warning(
+            'Invalid openapi_inventory value: %s. Expected one of: %s.',
+            fmt, ', '.join(_INVENTORY_FORMATS))
+        return
+
+    inventory = _build_inventory(
+        getattr(app.env, 'openapi_operations', {}),
+        app.builder.get_target_uri)
+
+    filename = os.path.join(app.outdir, 'openapi-inventory.' + fmt)
+    with io.open(filename, 'wt', encoding='utf-8') as stream:
+        if fmt == 'ndjson':
+            for operation in inventory:
+                stream.write(_dump_json(operation) + '\n')
+        else:
+            stream.write(_dump_json(inventory))
+
+    filename = os.path.join(app.outdir, 'openapi-searchindex.json')
+    with io.open(filename, 'wt', encoding='utf-8') as stream:
+        stream.write(_dump_json(_build_search_index(inventory)))
+
+
+def _dump_json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
 def setup(app):
     app.setup_extension('sphinxcontrib.httpdomain')
+    app.add_config_value('openapi_validate', 'off', 'env')
+    app.add_config_value('openapi_inventory', None, 'env')
+    app.add_config_value('openapi_render_jobs', 1, '')
     app.add_directive('openapi', OpenApi)
+    app.add_directive('openapi-diff', OpenApiDiff)
+    app.connect('env-purge-doc', _purge_operations)
+    app.connect('env-merge-info', _merge_operations)
+    app.connect('build-finished', _write_inventory)
+    return {'parallel_read_safe': True}
@@ -0,0 +1,145 @@
+"""
+    tests.bench_render
+    ------------------
+
+    Micro-benchmark of reStructuredText rendering on a synthetic spec.
+
+    Renders a spec with 10,000 operations by the current implementation and
+    by the one from a given git revision (the generator based renderer by
+    default), checks that both produce identical output and prints timings:
+
+        $ python tests/bench_render.py [REVISION]
+
+    :copyright: (c) 2016, Ihor Kalnytskyi.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import os
+import sys
+import types
+import timeit
+import subprocess
+import collections
+
+from sphinxcontrib import openapi
+
+
+# The upstream revision with the generator based renderer.
+BASELINE = '4eb68ca'
+
+
+def make_spec(count):
+    """Return a spec with ``2 * count`` operations using most of features."""
+    kind = {
+        'name': 'kind',
+        'in': 'path',
+        'type': 'string',
+        'required': True,
+        'description': 'Kind of resource.',
+    }
+
+    paths = collections.OrderedDict()
+    for i in range(count):
+        paths['/resources%d/{kind}' % i] = collections.OrderedDict([
+            ('get', collections.OrderedDict([
+                ('summary', 'List Resources\nof the given kind'),
+                ('description', 'Retrieves a list\nof resources %d.' % i),
+                ('parameters', [
+                    {
+                        'name': 'limit',
+                        'in': 'query',
+                        'type': 'integer',
+                        'description': 'Show up to `limit` entries.',
+                    },
+                    {
+                        'name': 'If-None-Match',
+                        'in': 'header',
+                        'type': 'string',
+                        'description': 'Last known resource ETag.',
+                    },
+                    kind,
+                ]),
+                ('responses', collections.OrderedDict([
+                    ('200', {
+                        'description': 'An array of resources.',
+                        'headers': {
+                            'ETag': {
+                                'description': 'Resource\nETag.',
+                                'type': 'string',
+                            },
+                        },
+                        'schema': {
+                            'example': collections.OrderedDict([
+                                ('items', [1, 'two', True, {'a': None}]),
+                                ('next', {'href': '/x', 'deep': {'z': 1}}),
+                                ('count', 2),
+                            ]),
+                        },
+                    }),
+                    ('404', {'description': 'Not found.'}),
+                ])),
+            ])),
+            ('post', collections.OrderedDict([
+                ('description', 'Create a resource.'),
+                ('parameters', [
+                    {
+                        'name': 'body',
+                        'in': 'body',
+                        'schema': {
+                            'properties': collections.OrderedDict([
+                                ('size', {
+                                    'type': 'integer',
+                                    'minimum': 1,
+                                    'description': 'Size.',
+                                }),
+                                ('label', {'type': 'string'}),
+                            ]),
+                            'example': {'size': 3, 'label': 'x'},
+                        },
+                    },
+                    kind,
+                ]),
+                ('responses', {'201': {'description': 'Created.'}}),
+            ])),
+        ])
+    return {'paths': paths}
+
+
+def load_revision(revision):
+    source = subprocess.check_output(
+        ['git', 'show', '%s:sphinxcontrib/openapi.py' % revision],
+        cwd=os.path.dirname(os.path.abspath(__file__)))
+    module = types.ModuleType(str('openapi_%s' % revision))
+    exec(compile(source, module.__name__, 'exec'), module.__dict__)
+    return module
+
+
+def render(module, operations):
+    lines = []
+    for endpoint, method, properties in operations:
+        if module._httpresource.__code__.co_argcount == 3:
+            lines.extend(module._httpresource(endpoint, method, properties))
+        else:
+            module._httpresource(endpoint, method, properties, lines)
+    return '\n'.join(lines)
+
+
+def main(revision=BASELINE):
+    # The spec is already normalized, i.e. it has neither references nor
+    # common parameters, so only rendering is measured.
+    operations = openapi._iterate_operations(make_spec(5000))
+
+    baseline = load_revision(revision)
+    if render(baseline, operations) != render(openapi, operations):
+        sys.exit('Rendered output differs from %s one.' % revision)
+
+    for name, module in [(revision, baseline), ('current', openapi)]:
+        elapsed = min(timeit.repeat(
+            lambda: render(module, operations), number=1, repeat=5))
+        print('%-10s %d operations: %.3fs' % (name, len(operations), elapsed))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -10,12 +10,20 @@
 
 from __future__ import unicode_literals
 
+import io
 import os
+import sys
+import json
 import textwrap
+import subprocess
+import multiprocessing
 import collections
 
+import yaml
 import pytest
 
+from sphinx.application import Sphinx
+
 from sphinxcontrib import openapi
 
 
@@ -269,6 +277,65 @@ class TestOpenApi2HttpDomain(object):
                   ok
         ''').lstrip()
 
+    def test_list_example(self):
+        spec = {
+            'paths': {
+                '/resources': {
+                    'get': {
+                        'description': 'resources',
+                        'responses': {
+                            '200': {
+                                'description': 'ok',
+                                'schema': {
+                                    'example': [{'id': 1}, 'two', [3]],
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        }
+
+        text = '\n'.join(openapi.openapi2httpdomain(spec))
+        assert text == textwrap.dedent('''
+            get /resources
+            **************
+
+            resources
+
+
+
+            **Status code :**
+
+            * 200 - ok
+
+            Response example ::
+
+               [
+                  {
+                     "id": 1
+                  },
+                  "two",
+                  [
+                     3
+                  ]
+               ]
+
+        ''').lstrip()
+
+    def test_render(self):
+        testdata = os.path.join(os.path.dirname(__file__), 'testdata')
+
+        with io.open(os.path.join(testdata, 'render.yml'), 'rt',
+                     encoding='utf-8') as stream:
+            spec = yaml.load(stream, openapi._get_yaml_loader())
+        with io.open(os.path.join(testdata, 'render.rst'), 'rt',
+                     encoding='utf-8') as stream:
+            expected = stream.read()
+
+        text = '\n'.join(openapi.openapi2httpdomain(spec)) + '\n'
+        assert text == expected
+
 
 class TestResolveRefs(object):
 
@@ -320,3 +387,666 @@ class TestResolveRefs(object):
                 'c': True,
             }
         }
+
+
+class TestValidateSpec(object):
+
+    def test_valid(self):
+        spec = {
+            'swagger': '2.0',
+            'info': {'title': 'Test', 'version': '1.0'},
+            'paths': {
+                '/resources/{kind}': {
+                    'parameters': [
+                        {
+                            'name': 'kind',
+                            'in': 'path',
+                            'type': 'string',
+                            'required': True,
+                        },
+                    ],
+                    'get': {
+                        'responses': {
+                            200: {
+                                'description': 'ok',
+                                'headers': {
+                                    'ETag': {
+                                        'description': 'Resource ETag.',
+                                        'type': 'string',
+                                    },
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        }
+
+        assert openapi._validate_spec(spec, 'fast') == []
+        assert openapi._validate_spec(spec, 'full') == []
+
+    def test_structure_errors(self):
+        spec = {
+            'paths': {
+                '/resource_a': {
+                    'get': {
+                        'description': 'resource a',
+                    },
+                    'post': {
+                        'parameters': [
+                            {'name': 'limit', 'in': 'query'},
+                            {'name': 'data', 'in': 'body'},
+                            {'name': 'x', 'in': 'nowhere', 'type': 'string'},
+                            {'$ref': '#/parameters/foo'},
+                        ],
+                        'responses': {
+                            '200': {
+                                'description': 'ok',
+                                'headers': {'ETag': {'type': 'string'}},
+                            },
+                        },
+                    },
+                },
+            },
+        }
+
+        assert openapi._validate_spec(spec, 'fast') == [
+            (('paths', '/resource_a', 'get'),
+             "'responses' is a required property"),
+            (('paths', '/resource_a', 'post', 'parameters', 0),
+             "'type' is a required property"),
+            (('paths', '/resource_a', 'post', 'parameters', 1),
+             "body parameter must have 'schema' with 'properties'"),
+            (('paths', '/resource_a', 'post', 'parameters', 2, 'in'),
+             "unknown parameter location 'nowhere'"),
+            (('paths', '/resource_a', 'post', 'responses', '200', 'headers',
+              'ETag'),
+             "'description' is a required property"),
+        ]
+
+    def test_reusable_sections(self):
+        spec = {
+            'parameters': {
+                'Limit': {'name': 'limit', 'type': 'integer'},
+            },
+            'responses': {
+                'Ok': {
+                    'description': 'ok',
+                    'headers': {'ETag': {'type': 'string'}},
+                },
+            },
+            'components': {
+                'parameters': {
+                    'Offset': {
+                        'name': 'offset',
+                        'in': 'nowhere',
+                        'type': 'integer',
+                    },
+                },
+                'responses': [],
+            },
+            'paths': {
+                '/resource_a': {
+                    'get': {
+                        'parameters': [{'$ref': '#/parameters/Limit'}],
+                        'responses': {'200': {'$ref': '#/responses/Ok'}},
+                    },
+                },
+            },
+        }
+
+        assert openapi._validate_spec(spec, 'fast') == [
+            (('parameters', 'Limit'), "'in' is a required property"),
+            (('responses', 'Ok', 'headers', 'ETag'),
+             "'description' is a required property"),
+            (('components', 'parameters', 'Offset', 'in'),
+             "unknown parameter location 'nowhere'"),
+            (('components', 'responses'), 'responses must be a mapping'),
+        ]
+
+    def test_non_operation_keys(self):
+        spec = {
+            'paths': {
+                '/resource_a': collections.OrderedDict([
+                    ('x-internal', True),
+                    ('summary', 'Resource A'),
+                    ('get', {
+                        'description': 'resource a',
+                        'responses': {'200': {'description': 'ok'}},
+                    }),
+                ]),
+            },
+        }
+
+        assert openapi._validate_spec(spec, 'fast') == []
+
+        text = '\n'.join(openapi.openapi2httpdomain(spec))
+        assert text.startswith('get /resource_a\n')
+        assert 'x-internal' not in text
+
+    def test_paths_missing(self):
+        assert openapi._validate_spec({}, 'fast') == [
+            ((), "'paths' is a required property"),
+        ]
+
+    def test_full_reports_schema_errors(self):
+        spec = {
+            'swagger': '2.0',
+            'paths': {},
+        }
+
+        assert openapi._validate_spec(spec, 'fast') == []
+        assert openapi._validate_spec(spec, 'full') == [
+            ((), "'info' is a required property"),
+        ]
+
+    def test_full_unsupported_version(self, monkeypatch):
+        warnings = []
+        monkeypatch.setattr(
+            openapi.logger, 'warning', lambda *args: warnings.append(args))
+
+        assert openapi._validate_spec({
+            'openapi': '3.1.0',
+            'paths': {},
+        }, 'full') == []
+        assert warnings == [(
+            'No OpenAPI meta-schema for version %r, skipping its validation.',
+            '3.1.0',
+        )]
+
+    def test_verdict_is_cached(self, monkeypatch):
+        calls = []
+
+        def _validate_spec(spec, mode):
+            calls.append(mode)
+            return []
+
+        monkeypatch.setattr(openapi, '_validate_spec', _validate_spec)
+        monkeypatch.setattr(openapi, '_validation_cache', {})
+
+        assert openapi._validate_spec_cached(
+            'paths: {}', {'paths': {}}, 'fast') == ([], True)
+        assert openapi._validate_spec_cached(
+            'paths: {}', {'paths': {}}, 'fast') == ([], False)
+        assert openapi._validate_spec_cached(
+            'paths: {}', {'paths': {}}, 'full') == ([], True)
+
+        assert calls == ['fast', 'full']
+
+    def test_errors_are_located_once(self, monkeypatch):
+        monkeypatch.setattr(openapi, '_validation_cache', {})
+        text = textwrap.dedent('''
+            paths:
+              /resource_a:
+                get:
+                  description: resource a
+        ''')
+        spec = yaml.load(text, openapi._get_yaml_loader())
+
+        errors = [(4, "#/paths/~1resource_a/get: "
+                      "'responses' is a required property")]
+        assert openapi._validate_spec_cached(text, spec, 'fast') == (
+            errors, True)
+
+        monkeypatch.setattr(yaml, 'compose', None)
+        assert openapi._validate_spec_cached(text, spec, 'fast') == (
+            errors, False)
+
+    def test_find_line(self):
+        root = yaml.compose(textwrap.dedent('''
+            paths:
+              /resource_a:
+                get:
+                  parameters:
+                    - name: limit
+                      in: query
+        '''), yaml.SafeLoader)
+
+        assert openapi._find_line(root, (
+            'paths', '/resource_a', 'get')) == 4
+        assert openapi._find_line(root, (
+            'paths', '/resource_a', 'get', 'parameters', 0, 'in')) == 7
+        assert openapi._find_line(root, (
+            'paths', '/resource_a', 'post', 'responses')) == 3
+
+
+class TestInventory(object):
+
+    def _operation(self, method, path, anchor, **kwargs):
+        return collections.OrderedDict([
+            ('method', method),
+            ('path', path),
+            ('operationId', kwargs.get('operationId')),
+            ('tags', kwargs.get('tags', [])),
+            ('summary', kwargs.get('summary')),
+            ('docname', kwargs.get('docname', 'index')),
+            ('anchor', anchor),
+        ])
+
+    def test_iterate_operations(self):
+        spec = collections.defaultdict(collections.OrderedDict)
+        spec['paths']['/resource_a'] = collections.OrderedDict([
+            ('get', {'responses': {}}),
+            ('post', {'responses': {}}),
+        ])
+        spec['paths']['/resource_b'] = {'put': {'responses': {}}}
+
+        assert openapi._iterate_operations(spec) == [
+            ('/resource_a', 'get', {'responses': {}}),
+            ('/resource_a', 'post', {'responses': {}}),
+            ('/resource_b', 'put', {'responses': {}}),
+        ]
+        assert openapi._iterate_operations(spec, paths=['/resource_b']) == [
+            ('/resource_b', 'put', {'responses': {}}),
+        ]
+
+    def test_build_inventory(self):
+        inventory = openapi._build_inventory({
+            'b': [self._operation('GET', '/b', 'get-b', docname='b')],
+            'a': [
+                self._operation('GET', '/a', 'get-a', docname='a'),
+                self._operation('POST', '/a', None, docname='a'),
+            ],
+        }, lambda docname: docname + '.html')
+
+        assert [(o['method'], o['path'], o['uri']) for o in inventory] == [
+            ('GET', '/a', 'a.html#get-a'),
+            ('POST', '/a', 'a.html'),
+            ('GET', '/b', 'b.html#get-b'),
+        ]
+
+    def test_build_search_index(self):
+        index = openapi._build_search_index([
+            self._operation(
+                'GET', '/resources/{kind}', 'get-resources-kind',
+                operationId='listResources', tags=['Resources'],
+                summary='List Resources'),
+            self._operation(
+                'POST', '/resources', 'post-resources',
+                summary='Create a Resource'),
+        ])
+
+        assert index == {
+            'a': [1],
+            'create': [1],
+            'get': [0],
+            'kind': [0],
+            'list': [0],
+            'listresources': [0],
+            'post': [1],
+            'resource': [1],
+            'resources': [0, 1],
+        }
+
+    def test_merge_operations(self):
+        env = type(str('Env'), (object, ), {})()
+        env.openapi_operations = {'a': [self._operation('GET', '/a', None)]}
+        other = type(str('Env'), (object, ), {})()
+        other.openapi_operations = {
+            'b': [self._operation('GET', '/b', None)],
+            'c': [self._operation('GET', '/c', None)],
+        }
+
+        openapi._merge_operations(None, env, ['b'], other)
+        assert sorted(env.openapi_operations) == ['a', 'b']
+
+        openapi._purge_operations(None, env, 'a')
+        assert sorted(env.openapi_operations) == ['b']
+
+    def test_build(self, tmpdir):
+        srcdir = tmpdir.mkdir('src')
+        srcdir.join('conf.py').write(textwrap.dedent('''
+            master_doc = 'index'
+            extensions = ['sphinxcontrib.openapi']
+            openapi_inventory = 'json'
+        '''))
+        srcdir.join('api.yml').write(textwrap.dedent('''
+            swagger: '2.0'
+            paths:
+              /resources:
+                get:
+                  operationId: listResources
+                  tags: [Resources]
+                  summary: List Resources
+                  responses:
+                    '200':
+                      description: ok
+                post:
+                  summary: Create a Resource
+                  responses:
+                    '201':
+                      description: created
+        '''))
+        srcdir.join('index.rst').write(textwrap.dedent('''
+            API
+            ===
+
+            .. openapi:: api.yml
+        '''))
+        outdir = tmpdir.join('out')
+
+        app = Sphinx(
+            str(srcdir), str(srcdir), str(outdir),
+            str(tmpdir.join('doctrees')), 'html',
+            status=None, warning=None, freshenv=True)
+        app.build()
+
+        inventory = json.loads(outdir.join('openapi-inventory.json').read())
+        assert inventory == [
+            {
+                'method': 'GET',
+                'path': '/resources',
+                'operationId': 'listResources',
+                'tags': ['Resources'],
+                'summary': 'List Resources',
+                'docname': 'index',
+                'anchor': 'get-resources',
+                'uri': 'index.html#get-resources',
+            },
+            {
+                'method': 'POST',
+                'path': '/resources',
+                'operationId': None,
+                'tags': [],
+                'summary': 'Create a Resource',
+                'docname': 'index',
+                'anchor': 'post-resources',
+                'uri': 'index.html#post-resources',
+            },
+        ]
+
+        index = json.loads(outdir.join('openapi-searchindex.json').read())
+        assert index['resources'] == [0, 1]
+        assert index['listresources'] == [0]
+        assert index['create'] == [1]
+
+
+class TestRenderParallel(object):
+
+    def _spec(self):
+        spec = {'paths': collections.OrderedDict()}
+        for i in range(10):
+            spec['paths']['/resource_%d' % i] = collections.OrderedDict([
+                ('get', {
+                    'description': 'resource %d' % i,
+                    'responses': {'200': {'description': 'ok'}},
+                }),
+                ('delete', {
+                    'description': 'resource %d' % i,
+                    'responses': {'204': {'description': 'deleted'}},
+                }),
+            ])
+        return spec
+
+    @pytest.mark.parametrize('jobs', [2, 3, 100])
+    def test_same_as_serial(self, jobs):
+        serial = list(openapi.openapi2httpdomain(self._spec()))
+        parallel = list(openapi.openapi2httpdomain(self._spec(), jobs=jobs))
+        assert parallel == serial
+
+    @pytest.mark.parametrize('value, expected', [
+        (1, True),
+        (4, True),
+        (0, False),
+        (-2, False),
+        (None, False),
+        ('4', False),
+        (True, False),
+    ])
+    def test_is_positive_int(self, value, expected):
+        assert openapi._is_positive_int(value) is expected
+
+    def test_without_fork(self, monkeypatch):
+        # Spawned workers inherit nothing from the parent process, so the
+        # operations must be passed to them by the pool initializer.
+        spawn = multiprocessing.get_context('spawn')
+        monkeypatch.setattr(
+            multiprocessing, 'get_context', lambda method=None: spawn)
+
+        serial = list(openapi.openapi2httpdomain(self._spec()))
+        parallel = list(openapi.openapi2httpdomain(self._spec(), jobs=2))
+        assert parallel == serial
+
+
+class TestImportTime(object):
+
+    @pytest.mark.skipif(
+        sys.version_info < (3, 7), reason='-X importtime requires 3.7+')
+    def test_heavy_modules_are_not_imported(self):
+        # Modules shared with Sphinx are imported beforehand, so only modules
+        # imported because of the extension itself are reported after the
+        # marker line.
+        code = textwrap.dedent('''
+            import sys
+            import docutils.parsers.rst
+            import docutils.statemachine
+            import sphinx.util.logging
+            import sphinx.util.nodes
+            sys.stderr.write('--\\n')
+            sys.stderr.flush()
+            import sphinxcontrib.openapi
+        ''')
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            stderr=subprocess.STDOUT,
+            universal_newlines=True)
+
+        imported = set(
+            line.rsplit('|', 1)[-1].strip().split('.')[0]
+            for line in output.split('--\n', 1)[1].splitlines()
+            if line.startswith('import time:')
+        )
+
+        assert 'sphinxcontrib' in imported
+        assert not imported & {
+            'yaml', 'jsonschema', 'pkg_resources', 'multiprocessing',
+        }
+
+
+class TestOpenApiDiff2HttpDomain(object):
+
+    def _specs(self):
+        old = {'paths': collections.OrderedDict()}
+        old['paths']['/resource_a'] = collections.OrderedDict([
+            ('get', collections.OrderedDict([
+                ('description', 'resource a'),
+                ('responses', {'200': {'description': 'ok'}}),
+            ])),
+            ('delete', {
+                'description': 'resource a',
+                'responses': {'204': {'description': 'deleted'}},
+            }),
+        ])
+        old['paths']['/resource_b'] = {
+            'get': {
+                'description': 'resource b',
+                'responses': {'200': {'description': 'ok'}},
+            },
+        }
+
+        new = {'paths': collections.OrderedDict()}
+        new['paths']['/resource_a'] = collections.OrderedDict([
+            ('get', collections.OrderedDict([
+                ('responses', {'200': {'description': 'ok'}}),
+                ('description', 'resource a'),
+            ])),
+            ('post', {
+                'description': 'resource a',
+                'responses': {'201': {'description': 'created'}},
+            }),
+        ])
+        new['paths']['/resource_b'] = {
+            'get': {
+                'description': 'resource b',
+                'responses': {
+                    '200': {'description': 'ok'},
+                    '404': {'description': 'not found'},
+                },
+            },
+        }
+        return old, new
+
+    def test_diff_operations(self):
+        old, new = self._specs()
+
+        assert [
+            (change, endpoint, method, fields)
+            for change, endpoint, method, _, fields
+            in openapi._diff_operations(old, new)
+        ] == [
+            ('added', '/resource_a', 'post', []),
+            ('modified', '/resource_b', 'get', ['responses']),
+            ('removed', '/resource_a', 'delete', []),
+        ]
+
+    def test_diff_operations_mixed_keys(self):
+        old = {'paths': {'/a': {'get': {'responses': {
+            200: {'description': 'ok'},
+            'default': {'description': 'error'},
+        }}}}}
+        new = {'paths': {'/a': {'get': {'responses': {
+            200: {'description': 'ok'},
+            'default': {'description': 'failure'},
+        }}}}}
+
+        assert [
+            (change, fields)
+            for change, _, _, _, fields in openapi._diff_operations(old, new)
+        ] == [
+            ('modified', ['responses']),
+        ]
+
+    def test_diff_operations_recursive_schema(self):
+        def spec(description):
+            return {
+                'definitions': {
+                    'Node': {
+                        'description': description,
+                        'properties': {
+                            'child': {'$ref': '#/definitions/Node'},
+                        },
+                    },
+                },
+                'paths': {
+                    '/nodes': {
+                        'get': {'responses': {'200': {
+                            'description': 'ok',
+                            'schema': {'$ref': '#/definitions/Node'},
+                        }}},
+                        'delete': {'responses': {'204': {
+                            'description': 'deleted',
+                            'schema': {'$ref': '#/definitions/Node'},
+                        }}},
+                    },
+                },
+            }
+
+        old, new = spec('node'), spec('tree node')
+        del new['paths']['/nodes']['delete']['responses']['204']['schema']
+        openapi._normalize_spec(old)
+        openapi._normalize_spec(new)
+
+        assert [
+            (change, method, fields)
+            for change, _, method, _, fields
+            in openapi._diff_operations(old, new)
+        ] == [
+            ('modified', 'get', ['responses']),
+            ('modified', 'delete', ['responses']),
+        ]
+        assert list(openapi._diff_operations(old, old)) == []
+
+    def test_render(self):
+        old, new = self._specs()
+
+        text = '\n'.join(openapi.openapidiff2httpdomain(old, new))
+        assert text == textwrap.dedent('''
+            post /resource_a
+            ****************
+
+            *Added.*
+
+            resource a
+
+
+
+            **Status code :**
+
+            * 201 - created
+
+            get /resource_b
+            ***************
+
+            *Modified: responses.*
+
+            resource b
+
+
+
+            **Status code :**
+
+            * 200 - ok
+            * 404 - not found
+
+            delete /resource_a
+            ******************
+
+            *Removed.*
+
+            resource a
+
+
+
+            **Status code :**
+
+            * 204 - deleted
+        ''').lstrip()
+
+    def test_path_option(self):
+        old, new = self._specs()
+
+        text = '\n'.join(openapi.openapidiff2httpdomain(
+            old, new, paths=['/resource_b']))
+        assert text.startswith('get /resource_b\n')
+        assert '/resource_a' not in text
+
+    def test_path_invalid(self):
+        old, new = self._specs()
+
+        with pytest.raises(ValueError) as exc:
+            openapi.openapidiff2httpdomain(
+                old, new, paths=['/resource_a', '/resource_invalid_name'])
+
+        assert str(exc.value) == (
+            'One or more paths are not defined in the specs: '
+            '/resource_invalid_name.'
+        )
+
+
+class TestLoadSpec(object):
+
+    def test_cached(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(openapi, '_spec_cache', {})
+        path = tmpdir.join('spec.yml')
+        path.write('paths: {}\n')
+
+        text, spec = openapi._load_spec(str(path), 'utf-8')
+        assert text == 'paths: {}\n'
+        assert spec == {'paths': {}}
+
+        # Returned spec is a copy, so modifying it doesn't affect the cache.
+        spec['paths']['/resource_a'] = {}
+        assert openapi._load_spec(str(path), 'utf-8')[1] == {'paths': {}}
+
+    def test_reloaded_if_changed(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(openapi, '_spec_cache', {})
+        path = tmpdir.join('spec.yml')
+        path.write('paths: {}\n')
+        openapi._load_spec(str(path), 'utf-8')
+
+        path.write('paths: {/resource_a: {}}\n')
+        path.setmtime(path.mtime() + 10)
+
+        assert openapi._load_spec(str(path), 'utf-8')[1] == {
+            'paths': {'/resource_a': {}},
+        }